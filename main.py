@@ -2,6 +2,13 @@ import os
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
+from openai import (
+    OpenAIError,
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
 import pandas as pd
 import time
 
@@ -11,7 +18,14 @@ load_dotenv(_REPO_ROOT / ".env")
 if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
-from utils.filter_cold_outreach import load_cold_outreach_contacts
+from utils.filter_cold_outreach import load_contacts, select_cold_outreach_contacts
+from utils.contact import Contact, contacts_from_frame
+from utils.delta import (
+    load_fingerprint_store,
+    select_delta_contacts,
+    update_fingerprint_store,
+    save_fingerprint_store,
+)
 from utils.segmentation import segment_contact, get_company_size
 from utils.prompt_builder import build_prompt
 from utils.ai_engine import (
@@ -20,12 +34,37 @@ from utils.ai_engine import (
     submit_batch,
     poll_batch,
     parse_batch_results,
+    EmailValidationError,
     DEFAULT_SIGNATURE,
     BATCH_THRESHOLD,
     MODEL,
 )
 
 
+_OUTPUT_COLUMNS = [
+    "email", "segment", "subject", "greetings", "body", "signature",
+    "complete_email", "model", "input_tokens", "output_tokens",
+    "total_tokens", "cost_usd",
+]
+
+_RETRY_COLUMNS = ["email", "segment", "reason", "detail", "prompt"]
+
+# Extra realtime attempts for outputs that failed validation or hit a
+# transient API error.  Queues larger than BATCH_THRESHOLD are retried as
+# one follow-up batch instead, so realtime retries never exceed
+# BATCH_THRESHOLD * _RETRY_ATTEMPTS calls.
+_RETRY_ATTEMPTS = 1
+
+# Worth queueing for retry; anything else (bad key, bad request, unknown
+# model) is a configuration problem and stops the run
+_TRANSIENT_API_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
+
+
 def _build_row(email_addr: str, segment: str, result: dict) -> dict:
     complete_email = f"{result['greetings']}\n\n{result['body']}\n\n{result['signature']}"
     return {
@@ -44,34 +83,51 @@ def _build_row(email_addr: str, segment: str, result: dict) -> dict:
     }
 
 
-def _run_realtime_pipeline(contacts: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+def _queue_entry(email_addr: str, segment: str, prompt: str, reason: str, detail: str) -> dict:
+    print(f"[RETRY]  ✗ {email_addr}: {reason} {detail}".rstrip())
+    return {"email": email_addr, "segment": segment, "reason": reason,
+            "detail": detail, "prompt": prompt}
+
+
+def _run_realtime_pipeline(contacts: list[Contact]) -> tuple[pd.DataFrame, float, list[dict]]:
     print(f"[PIPELINE] Mode: REALTIME  ({len(contacts)} contacts, "
           f"<= {BATCH_THRESHOLD} threshold)")
     print(f"[PIPELINE] Each contact → segment → prompt → AI call → email")
     print()
 
     results = []
+    retry_queue = []
     total_cost = 0.0
-    for i, (_, row) in enumerate(contacts.iterrows(), 1):
-        email_addr = row.get("email", "")
+    for i, contact in enumerate(contacts, 1):
+        email_addr = contact.email
         print(f"── Contact {i}/{len(contacts)}: {email_addr} " + "─" * 30)
 
-        segment = segment_contact(row)
-        company_size = get_company_size(row)
-        prompt = build_prompt(row, segment, company_size=company_size)
+        segment = segment_contact(contact)
+        company_size = get_company_size(contact)
+        prompt = build_prompt(contact, segment, company_size=company_size)
         print(f"[PROMPT]         Prompt length: {len(prompt)} chars")
 
-        result = generate_email(prompt)
+        try:
+            result = generate_email(prompt)
+        except EmailValidationError as exc:
+            total_cost += exc.cost_usd
+            retry_queue.append(_queue_entry(email_addr, segment, prompt, exc.reason, exc.detail))
+            print()
+            continue
+        except _TRANSIENT_API_ERRORS as exc:
+            retry_queue.append(_queue_entry(email_addr, segment, prompt, "api_error", str(exc)))
+            print()
+            continue
         total_cost += result["cost_usd"]
         results.append(_build_row(email_addr, segment, result))
         print(f"[DONE]   ✓ Email generated for {email_addr}  "
               f"(running total: ${total_cost:.6f})")
         print()
 
-    return pd.DataFrame(results), total_cost
+    return pd.DataFrame(results, columns=_OUTPUT_COLUMNS), total_cost, retry_queue
 
 
-def _run_batch_pipeline(contacts: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+def _run_batch_pipeline(contacts: list[Contact]) -> tuple[pd.DataFrame, float, list[dict]]:
     count = len(contacts)
     print(f"[PIPELINE] Mode: BATCH  ({count} contacts, "
           f"> {BATCH_THRESHOLD} threshold)")
@@ -81,38 +137,118 @@ def _run_batch_pipeline(contacts: pd.DataFrame) -> tuple[pd.DataFrame, float]:
     print("── Building prompts (no AI yet) " + "─" * 33)
     prompts = []
     metadata = []
-    for i, (_, row) in enumerate(contacts.iterrows(), 1):
-        email_addr = row.get("email", "")
+    for i, contact in enumerate(contacts, 1):
+        email_addr = contact.email
         print(f"  [{i}/{count}] {email_addr}")
-        segment = segment_contact(row)
-        company_size = get_company_size(row)
-        prompt = build_prompt(row, segment, company_size=company_size)
+        segment = segment_contact(contact)
+        company_size = get_company_size(contact)
+        prompt = build_prompt(contact, segment, company_size=company_size)
         print(f"[PROMPT]         Prompt length: {len(prompt)} chars")
         prompts.append(prompt)
-        metadata.append({"email": email_addr, "segment": segment})
+        metadata.append({"email": email_addr, "segment": segment, "prompt": prompt})
 
     print()
     print("── Submitting to OpenAI Batch API (AI starts here) " + "─" * 13)
+    return _submit_batch_and_collect(metadata)
+
+
+def _submit_batch_and_collect(metadata: list[dict]) -> tuple[pd.DataFrame, float, list[dict]]:
+    """Run one batch job over ``metadata`` prompts and split results / failures."""
     batch_dir = _REPO_ROOT / "tmp"
     batch_dir.mkdir(parents=True, exist_ok=True)
     batch_path = batch_dir / f"batch_input_{time.time()}.jsonl"
 
-    prepare_batch_file(prompts, batch_path)
+    prepare_batch_file([meta["prompt"] for meta in metadata], batch_path)
     batch_id = submit_batch(batch_path)
     batch = poll_batch(batch_id)
-    batch_results = parse_batch_results(batch)
+    batch_results, batch_failures = parse_batch_results(batch)
+    failures = {f["index"]: f for f in batch_failures}
 
     print()
     print("── Assembling results " + "─" * 43)
     results = []
+    retry_queue = []
     total_cost = 0.0
-    for meta, result in zip(metadata, batch_results):
+    for idx, meta in enumerate(metadata):
+        result = batch_results.get(idx)
+        if result is None:
+            failure = failures.get(idx, {"reason": "missing", "detail": "no line in batch output",
+                                         "cost_usd": 0.0})
+            total_cost += failure["cost_usd"]
+            retry_queue.append(_queue_entry(meta["email"], meta["segment"], meta["prompt"],
+                                            failure["reason"], failure["detail"]))
+            continue
         total_cost += result["cost_usd"]
         results.append(_build_row(meta["email"], meta["segment"], result))
         print(f"  ✓ {meta['email']:40s}  segment={meta['segment']:12s}  "
               f"cost=${result['cost_usd']:.6f}")
 
-    return pd.DataFrame(results), total_cost
+    return pd.DataFrame(results, columns=_OUTPUT_COLUMNS), total_cost, retry_queue
+
+
+def _retry_failed(retry_queue: list[dict]) -> tuple[pd.DataFrame, float, list[dict]]:
+    """
+    One retry pass over the queue; whatever still fails stays queued.
+
+    Small queues are retried in realtime, larger ones as a single
+    follow-up batch at batch pricing.  Errors here never propagate: the
+    primary results (possibly a paid batch) must still be saved.
+    """
+    if len(retry_queue) > BATCH_THRESHOLD:
+        print(f"[RETRY] Retrying {len(retry_queue)} queued prompts as a follow-up batch …")
+        try:
+            results, total_cost, remaining = _submit_batch_and_collect(retry_queue)
+        except (OpenAIError, RuntimeError) as exc:
+            print(f"[RETRY] ✗ Follow-up batch failed, keeping all queued: {exc}")
+            return pd.DataFrame(columns=_OUTPUT_COLUMNS), 0.0, retry_queue
+        print(f"[RETRY] Recovered {len(results)}, {len(remaining)} still queued")
+        print()
+        return results, total_cost, remaining
+
+    print(f"[RETRY] Retrying {len(retry_queue)} queued prompts in realtime "
+          f"(up to {_RETRY_ATTEMPTS} attempt(s) each) …")
+    results = []
+    remaining = []
+    total_cost = 0.0
+    for i, entry in enumerate(retry_queue):
+        try:
+            row, cost, entry = _retry_realtime(entry)
+        except OpenAIError as exc:
+            # Non-transient (bad key, bad request …): every further call would fail too
+            print(f"[RETRY] ✗ Stopping retries: {exc}")
+            remaining.extend(retry_queue[i:])
+            break
+        total_cost += cost
+        if row is None:
+            remaining.append(_queue_entry(entry["email"], entry["segment"], entry["prompt"],
+                                          entry["reason"], entry["detail"]))
+            continue
+        results.append(row)
+        print(f"[RETRY]  ✓ {entry['email']}")
+    print(f"[RETRY] Recovered {len(results)}, {len(remaining)} still queued")
+    print()
+    return pd.DataFrame(results, columns=_OUTPUT_COLUMNS), total_cost, remaining
+
+
+def _retry_realtime(entry: dict) -> tuple[dict | None, float, dict]:
+    """Up to _RETRY_ATTEMPTS realtime calls for one queued prompt.
+
+    Returns ``(row or None, cost, entry)`` with the entry's reason updated
+    to the last failure.  Non-transient API errors propagate.
+    """
+    cost = 0.0
+    for _ in range(_RETRY_ATTEMPTS):
+        try:
+            result = generate_email(entry["prompt"])
+        except EmailValidationError as exc:
+            cost += exc.cost_usd
+            entry = {**entry, "reason": exc.reason, "detail": exc.detail}
+            continue
+        except _TRANSIENT_API_ERRORS as exc:
+            entry = {**entry, "reason": "api_error", "detail": str(exc)}
+            continue
+        return _build_row(entry["email"], entry["segment"], result), cost + result["cost_usd"], entry
+    return None, cost, entry
 
 
 def run():
@@ -129,12 +265,26 @@ def run():
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
-    # ── Stages 1-3 happen inside load_cold_outreach_contacts ────────────
-    contacts = load_cold_outreach_contacts(csv_path)
+    # ── Stages 1-3: load, then filter + segment ─────────────────────────
+    # The raw frame is kept so delta mode can see why contacts dropped out
+    raw_contacts = load_contacts(csv_path)
+    contacts = select_cold_outreach_contacts(raw_contacts)
 
     import yaml
     with open(_REPO_ROOT / "config.yml", "r") as f:
         config = yaml.safe_load(f)
+
+    # ── Stage 3b: Delta detection (optional) ────────────────────────────
+    delta_mode = bool(config.get("DELTA_MODE", False))
+    if delta_mode:
+        print("=" * 64)
+        print("  STAGE 3b · DELTA DETECTION  (deterministic, no AI)")
+        print("=" * 64)
+        store_path = _REPO_ROOT / config.get("DELTA_STORE", "state/contact_fingerprints.csv")
+        previous = load_fingerprint_store(store_path)
+        contacts, withdrawn, retired = select_delta_contacts(contacts, previous, raw_contacts)
+        print()
+
     limit = int(config.get("OUTBOUND_LIMIT", 5))
     contacts = contacts.head(limit)
     print("=" * 64)
@@ -151,10 +301,21 @@ def run():
     print(f"[AI-CONFIG] Batch threshold: {BATCH_THRESHOLD}")
     print()
 
-    if len(contacts) > BATCH_THRESHOLD:
-        out_emails, total_cost = _run_batch_pipeline(contacts)
+    records = contacts_from_frame(contacts)
+    if len(records) > BATCH_THRESHOLD:
+        out_emails, total_cost, retry_queue = _run_batch_pipeline(records)
     else:
-        out_emails, total_cost = _run_realtime_pipeline(contacts)
+        out_emails, total_cost, retry_queue = _run_realtime_pipeline(records)
+
+    if retry_queue:
+        retried, retry_cost, retry_queue = _retry_failed(retry_queue)
+        # Keep output in input order (records carry the same stripped
+        # email that _build_row wrote to out_emails)
+        order = {record.email: i for i, record in enumerate(records)}
+        out_emails = pd.concat([out_emails, retried], ignore_index=True)
+        out_emails = out_emails.sort_values("email", key=lambda col: col.map(order),
+                                            kind="stable", ignore_index=True)
+        total_cost += retry_cost
 
     # ── Stage 6: Save results ───────────────────────────────────────────
     print("=" * 64)
@@ -166,6 +327,23 @@ def run():
     out_emails.to_csv(out_path, index=False)
     print(f"[SAVE] {len(out_emails)} emails → {out_path}")
 
+    if retry_queue:
+        retry_path = out_dir / f"retry_queue_{time.time()}.csv"
+        pd.DataFrame(retry_queue, columns=_RETRY_COLUMNS).to_csv(retry_path, index=False)
+        print(f"[SAVE] {len(retry_queue)} prompts queued for retry → {retry_path}")
+
+    if delta_mode:
+        withdrawn_path = out_dir / f"withdrawn_emails_{time.time()}.csv"
+        withdrawn.to_csv(withdrawn_path, index=False)
+        print(f"[SAVE] {len(withdrawn)} withdrawn contacts → {withdrawn_path}")
+
+        # Queued contacts are left out so the next run picks them up again
+        generated_emails = set(out_emails["email"])
+        generated = contacts.loc[[record.email in generated_emails for record in records]]
+        store = update_fingerprint_store(previous, generated, retired)
+        save_fingerprint_store(store, store_path)
+        print(f"[SAVE] {len(store)} fingerprints → {store_path}")
+
     elapsed = time.time() - t_start
     print()
     print("=" * 64)
@@ -174,6 +352,7 @@ def run():
     seg_dist = out_emails["segment"].value_counts().to_dict()
     print(f"[SUMMARY] Emails generated : {len(out_emails)}")
     print(f"[SUMMARY] Segment breakdown: {seg_dist}")
+    print(f"[SUMMARY] Queued for retry : {len(retry_queue)}")
     print(f"[SUMMARY] Total cost       : ${total_cost:.6f} USD")
     print(f"[SUMMARY] Wall time        : {elapsed:.1f}s")
     print(f"[SUMMARY] Output file      : {out_path}")
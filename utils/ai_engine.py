@@ -1,7 +1,9 @@
 import os
+import re
 import json
 import time
 from pathlib import Path
+from typing import Callable
 from openai import OpenAI
 from pydantic import BaseModel
 
@@ -16,6 +18,10 @@ DEFAULT_SIGNATURE = "Best regards,\nShreyas Jadhav\nPriceLabs"
 
 BATCH_THRESHOLD = 10
 
+# Prompt asks for < 120 words; leave some headroom before rejecting
+MIN_BODY_WORDS = 15
+MAX_BODY_WORDS = 150
+
 MODEL_PRICING = {
     "gpt-4.1": (2.00, 8.00),
     "gpt-4.1-mini": (0.40, 1.60),
@@ -56,11 +62,15 @@ def _cold_email_response_format() -> dict:
     }
 
 
-def _build_result(email: ColdEmail, prompt_tokens: int, completion_tokens: int) -> dict:
+def _cost_usd(prompt_tokens: int, completion_tokens: int) -> float:
     input_per_1m, output_per_1m = _get_pricing(MODEL)
     cost_usd = (prompt_tokens / 1_000_000 * input_per_1m) + (
         completion_tokens / 1_000_000 * output_per_1m
     )
+    return round(cost_usd, 6)
+
+
+def _build_result(email: ColdEmail, prompt_tokens: int, completion_tokens: int) -> dict:
     return {
         "subject": email.subject,
         "greetings": email.greetings,
@@ -70,27 +80,160 @@ def _build_result(email: ColdEmail, prompt_tokens: int, completion_tokens: int)
         "input_tokens": prompt_tokens,
         "output_tokens": completion_tokens,
         "total_tokens": prompt_tokens + completion_tokens,
-        "cost_usd": round(cost_usd, 6),
+        "cost_usd": _cost_usd(prompt_tokens, completion_tokens),
     }
 
 
-def generate_email(prompt: str) -> dict:
+# --- Output validation ---
+
+class EmailValidationError(ValueError):
+    """A model response that could not be turned into a usable ColdEmail.
+
+    ``cost_usd`` carries what the rejected response was billed, so callers
+    can still count it towards the run total.
+    """
+
+    def __init__(self, reason: str, detail: str = "", cost_usd: float = 0.0):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+        self.cost_usd = cost_usd
+
+
+_COLD_EMAIL_FIELDS = tuple(ColdEmail.model_fields)
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_BLANK_LINE_RE = re.compile(r"\n[ \t]*\n")
+_REFUSAL_RE = re.compile(
+    r"^\s*(?:i'?m sorry|i am sorry|i can(?:no|')t|i'?m unable|i am unable)",
+    re.IGNORECASE,
+)
+
+
+def _load_json_object(content: str) -> dict:
+    """Parse *content* as JSON, repairing common model slips on failure.
+
+    The fast path is a plain ``json.loads``; repair (code fences, prose
+    around the object, trailing commas, raw newlines in strings) only
+    runs when that fails.
+    """
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    if _REFUSAL_RE.match(content):
+        raise EmailValidationError("refusal", content[:200])
+
+    repaired = _CODE_FENCE_RE.sub("", content)
+    start, end = repaired.find("{"), repaired.rfind("}")
+    if start != -1 and end > start:
+        repaired = repaired[start:end + 1]
+    repaired = _TRAILING_COMMA_RE.sub(r"\1", repaired)
+    try:
+        return json.loads(repaired, strict=False)
+    except json.JSONDecodeError as exc:
+        raise EmailValidationError("invalid_json", str(exc)) from None
+
+
+def _normalise_line(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _normalise_body(text: str) -> str:
+    """Collapse whitespace and re-join paragraphs with one blank line."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n").strip()
+    if _BLANK_LINE_RE.search(text):
+        chunks = _BLANK_LINE_RE.split(text)
+    else:
+        # Model used single newlines as paragraph breaks
+        chunks = text.split("\n")
+    paragraphs = [" ".join(chunk.split()) for chunk in chunks]
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def validate_cold_email(
+    content: str | dict | None,
+    finish_reason: str | None = None,
+    refusal: str | None = None,
+) -> ColdEmail:
+    """
+    Strict, local validation of one model response.
+
+    Rejects refusals, truncated / filtered completions, non-JSON output,
+    missing / extra / non-string fields and out-of-range body lengths.
+    Repairs malformed JSON where possible and normalises whitespace.
+    Raises ``EmailValidationError`` with a short ``reason`` code.
+    """
+    if refusal:
+        raise EmailValidationError("refusal", refusal[:200])
+    if finish_reason == "length":
+        raise EmailValidationError("truncated", "finish_reason=length")
+    if finish_reason == "content_filter":
+        raise EmailValidationError("content_filter", "finish_reason=content_filter")
+    if not content:
+        raise EmailValidationError("empty", "no content returned")
+
+    data = content if isinstance(content, dict) else _load_json_object(content)
+    if not isinstance(data, dict):
+        raise EmailValidationError("schema", f"expected object, got {type(data).__name__}")
+
+    missing = [f for f in _COLD_EMAIL_FIELDS if not isinstance(data.get(f), str)]
+    if missing:
+        raise EmailValidationError("schema", f"missing or non-string fields: {missing}")
+    extra = sorted(set(data) - set(_COLD_EMAIL_FIELDS))
+    if extra:
+        raise EmailValidationError("schema", f"unexpected fields: {extra}")
+
+    subject = _normalise_line(data["subject"])
+    greetings = _normalise_line(data["greetings"])
+    body = _normalise_body(data["body"])
+    if not subject or not greetings or not body:
+        raise EmailValidationError("schema", "empty subject, greetings or body")
+
+    words = len(body.split())
+    if not MIN_BODY_WORDS <= words <= MAX_BODY_WORDS:
+        raise EmailValidationError(
+            "body_length", f"{words} words (allowed {MIN_BODY_WORDS}-{MAX_BODY_WORDS})"
+        )
+
+    # Fields are already checked above, so skip pydantic's validation pass
+    return ColdEmail.model_construct(subject=subject, greetings=greetings, body=body)
+
+
+EmailValidator = Callable[[str | dict | None, str | None, str | None], ColdEmail]
+
+
+def generate_email(prompt: str, validator: EmailValidator = validate_cold_email) -> dict:
+    """Generate one email.  Raises ``EmailValidationError`` on unusable output."""
     print(f"[AI]    ⚡ Calling OpenAI  model={MODEL}  temp=0.4 …")
     t0 = time.time()
 
-    response = client.beta.chat.completions.parse(
+    response = client.chat.completions.create(
         model=MODEL,
         messages=[{"role": "user", "content": prompt}],
-        response_format=ColdEmail,
+        response_format=_cold_email_response_format(),
         temperature=0.4,
         top_p=0.9,
     )
 
     elapsed = time.time() - t0
-    email: ColdEmail = response.choices[0].message.parsed
     usage = response.usage
     prompt_tokens = usage.prompt_tokens if usage else 0
     completion_tokens = usage.completion_tokens if usage else 0
+
+    choice = response.choices[0]
+    try:
+        email = validator(
+            choice.message.content,
+            choice.finish_reason,
+            getattr(choice.message, "refusal", None),
+        )
+    except EmailValidationError as exc:
+        exc.cost_usd = _cost_usd(prompt_tokens, completion_tokens)
+        print(f"[AI]    ✗ Invalid response in {elapsed:.1f}s  "
+              f"reason={exc.reason}  cost=${exc.cost_usd:.6f}")
+        raise
     result = _build_result(email, prompt_tokens, completion_tokens)
 
     print(f"[AI]    ✓ Response in {elapsed:.1f}s  "
@@ -159,27 +302,72 @@ def poll_batch(batch_id: str, poll_interval: int = 15) -> object:
         time.sleep(poll_interval)
 
 
-def parse_batch_results(batch) -> list[dict]:
-    print(f"[AI]    Downloading batch results from {batch.output_file_id} …")
-    result_content = client.files.content(batch.output_file_id)
+def _batch_file_lines(file_id: str | None) -> list[str]:
+    if not file_id:
+        return []
+    print(f"[AI]    Downloading batch file {file_id} …")
+    return client.files.content(file_id).text.splitlines()
+
+
+def parse_batch_results(
+    batch, validator: EmailValidator = validate_cold_email
+) -> tuple[dict[int, dict], list[dict]]:
+    """
+    Download and validate batch output.
+
+    Reads both the output file and, when present, the error file (where
+    the Batch API puts per-request failures).  Returns ``(results,
+    failures)``: results keyed by prompt index, and one ``{"index",
+    "reason", "detail", "cost_usd"}`` entry per request that failed or
+    didn't validate, so the caller can queue it for retry instead of
+    losing the whole batch.
+    """
+    lines = (_batch_file_lines(batch.output_file_id)
+             + _batch_file_lines(getattr(batch, "error_file_id", None)))
     results = {}
+    failures = []
     total_cost = 0.0
-    for line in result_content.text.strip().split("\n"):
-        data = json.loads(line)
-        idx = int(data["custom_id"].split("-")[1])
-        response_body = data["response"]["body"]
-
-        content = json.loads(response_body["choices"][0]["message"]["content"])
-        email = ColdEmail(**content)
-
-        usage = response_body.get("usage", {})
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            idx = int(data["custom_id"].split("-")[1])
+        except (json.JSONDecodeError, KeyError, IndexError, ValueError) as exc:
+            print(f"[AI]    ✗ Skipping unreadable batch line: {exc}")
+            continue
+
+        response = data.get("response") or {}
+        if data.get("error") or response.get("status_code", 200) != 200:
+            error = data.get("error") or (response.get("body") or {}).get("error")
+            failures.append({"index": idx, "reason": "request_error",
+                             "detail": str(error), "cost_usd": 0.0})
+            continue
+
+        response_body = response.get("body") or {}
+        usage = response_body.get("usage") or {}
         prompt_tokens = usage.get("prompt_tokens", 0)
         completion_tokens = usage.get("completion_tokens", 0)
 
+        choice = (response_body.get("choices") or [{}])[0]
+        message = choice.get("message") or {}
+        try:
+            email = validator(
+                message.get("content"),
+                choice.get("finish_reason"),
+                message.get("refusal"),
+            )
+        except EmailValidationError as exc:
+            cost_usd = _cost_usd(prompt_tokens, completion_tokens)
+            total_cost += cost_usd
+            failures.append({"index": idx, "reason": exc.reason,
+                             "detail": exc.detail, "cost_usd": cost_usd})
+            continue
+
         result = _build_result(email, prompt_tokens, completion_tokens)
         total_cost += result["cost_usd"]
         results[idx] = result
 
     print(f"[AI]    ✓ Parsed {len(results)} batch results  "
-          f"total_cost=${total_cost:.6f}")
-    return [results[i] for i in sorted(results.keys())]
+          f"failed={len(failures)}  total_cost=${total_cost:.6f}")
+    return results, failures
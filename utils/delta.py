@@ -0,0 +1,159 @@
+import hashlib
+import pandas as pd
+from pathlib import Path
+
+from utils.filter_cold_outreach import ineligibility_reasons
+
+# ── Columns that can change what we send (segment, prompt) ──────────────
+# Eligibility columns are left out: they are constant across contacts that
+# pass the filter, and changes to them surface as withdrawals instead.
+_FINGERPRINT_COLUMNS = [
+    # Firmographic segmentation (Stage 3)
+    "MU_count",
+    "PMS",
+    "is_generic_domain",
+    # Prompt personalisation (Stage 5)
+    "first_name",
+    "company_name",
+    "job_title",
+    "type_of_properties_managed",
+    "region",
+]
+
+_STORE_COLUMNS = ["email", "fingerprint"]
+_WITHDRAWN_COLUMNS = ["email", "reason"]
+
+# Failing only this rule means "already emailed", not "suppressed"
+_EMAILED_RULE = "total_emails_sent"
+
+_FIELD_SEPARATOR = "\x1f"
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────
+
+def _email_key(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip().str.lower()
+
+
+def _format_value(value) -> str:
+    if pd.isna(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+# ── Fingerprints ───────────────────────────────────────────────────────
+
+def fingerprint_contacts(df: pd.DataFrame) -> pd.Series:
+    """Hash the delta-relevant columns of each row into a hex fingerprint.
+
+    Values are normalised first (NaN → ``""``, ``18.0`` → ``"18"``,
+    surrounding whitespace stripped) so dtype drift between CSV exports
+    does not show up as a change.  ``blake2b`` keeps the fingerprint
+    stable across Python and pandas versions.
+    """
+    relevant = df.reindex(columns=_FINGERPRINT_COLUMNS).apply(
+        lambda col: col.map(_format_value)
+    )
+    return pd.Series(
+        [
+            hashlib.blake2b(
+                _FIELD_SEPARATOR.join(values).encode("utf-8"), digest_size=8
+            ).hexdigest()
+            for values in relevant.itertuples(index=False, name=None)
+        ],
+        index=df.index,
+        dtype=object,
+    )
+
+
+def load_fingerprint_store(store_path: Path | str) -> pd.DataFrame:
+    """Load the ``email → fingerprint`` store written by the previous run."""
+    store_path = Path(store_path)
+    if not store_path.exists():
+        return pd.DataFrame(columns=_STORE_COLUMNS)
+    store = pd.read_csv(store_path, dtype=str).reindex(columns=_STORE_COLUMNS)
+    store["email"] = _email_key(store["email"])
+    return store.drop_duplicates("email", keep="last")
+
+
+def save_fingerprint_store(store: pd.DataFrame, store_path: Path | str) -> Path:
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    store.to_csv(store_path, index=False, columns=_STORE_COLUMNS)
+    return store_path
+
+
+# ── Delta detection ────────────────────────────────────────────────────
+
+def select_delta_contacts(
+    df: pd.DataFrame, previous: pd.DataFrame, raw: pd.DataFrame
+) -> tuple[pd.DataFrame, pd.DataFrame, list[str]]:
+    """
+    Compare eligible contacts against the previous run's fingerprint store.
+
+    *df* is the filtered + segmented frame, *raw* the unfiltered CSV it
+    came from (used to explain why stored contacts dropped out).
+
+    Returns:
+        delta      — eligible contacts that are new or whose fingerprint
+                     changed, with a ``fingerprint`` column added
+        withdrawn  — ``email`` / ``reason`` for stored contacts that became
+                     ineligible (unsubscribed, blocked, no longer a prospect,
+                     removed from the CRM) and whose pending output should
+                     be pulled
+        retired    — every stored email that is no longer eligible,
+                     including ones that were simply emailed; these are
+                     removed from the store
+    """
+    print(f"[DELTA] Comparing {len(df)} eligible contacts against "
+          f"{len(previous)} stored fingerprints …")
+    df = df.copy()
+    df["fingerprint"] = fingerprint_contacts(df)
+    keys = _email_key(df["email"])
+
+    known = dict(zip(previous["email"], previous["fingerprint"]))
+    stored = keys.map(known)
+    is_new = stored.isna()
+    is_changed = ~is_new & (stored != df["fingerprint"])
+    delta = df.loc[is_new | is_changed].reset_index(drop=True)
+
+    # Stored contacts that dropped out: work out which rule(s) they now fail
+    retired = sorted(set(known) - set(keys))
+    reasons = pd.Series(ineligibility_reasons(raw).values, index=_email_key(raw["email"]))
+    reasons = reasons[~reasons.index.duplicated(keep="last")]
+    retired_reasons = reasons.reindex(retired).fillna("not_in_crm")
+    is_emailed = retired_reasons == _EMAILED_RULE
+    withdrawn = pd.DataFrame({
+        "email": retired_reasons.index[~is_emailed],
+        "reason": retired_reasons.values[~is_emailed],
+    }, columns=_WITHDRAWN_COLUMNS)
+    emailed = int(is_emailed.sum())
+
+    unchanged = len(df) - len(delta)
+    print(f"[DELTA]   ├─ new          : {int(is_new.sum())}")
+    print(f"[DELTA]   ├─ changed      : {int(is_changed.sum())}")
+    print(f"[DELTA]   ├─ unchanged    : {unchanged} (skipped)")
+    print(f"[DELTA]   ├─ emailed      : {emailed} (dropped from store)")
+    print(f"[DELTA]   └─ withdrawn    : {len(withdrawn)} (suppressed or removed)")
+    return delta, withdrawn, retired
+
+
+def update_fingerprint_store(
+    previous: pd.DataFrame, processed: pd.DataFrame, retired: list[str]
+) -> pd.DataFrame:
+    """
+    Build the next fingerprint store.
+
+    Only contacts actually sent to generation get their fingerprint
+    recorded; anything skipped by OUTBOUND_LIMIT keeps its old entry (or
+    stays absent) so it is picked up again on the next run.
+    """
+    processed = pd.DataFrame({
+        "email": _email_key(processed["email"]),
+        "fingerprint": processed["fingerprint"],
+    })
+    kept = previous.loc[~previous["email"].isin(retired)]
+    store = pd.concat([kept, processed], ignore_index=True)
+    return store.drop_duplicates("email", keep="last").reset_index(drop=True)
@@ -21,6 +21,31 @@ def _load_config() -> dict:
 
 # ── Stage filter (eligibility gate) ────────────────────────────────────
 
+# Rule name (= config.yml flag) → log label
+_RULE_LABELS = {
+    "type": "type == 'prospect'        ",
+    "Unsubscribed": "Unsubscribed == FALSE      ",
+    "is_blocked_domain": "is_blocked_domain == FALSE  ",
+    "total_emails_sent": "total_emails_sent == 0      ",
+}
+
+
+def _eligibility_rules(df: pd.DataFrame, config: dict) -> dict[str, pd.Series]:
+    """Pass-mask per *enabled* rule, keyed by its config.yml flag name."""
+    rules = {}
+    if config.get("type", True):
+        rules["type"] = df["type"].astype(str).str.strip().str.lower() == "prospect"
+    if config.get("Unsubscribed", True):
+        rules["Unsubscribed"] = ~_to_bool(df["Unsubscribed"])
+    if config.get("is_blocked_domain", True):
+        rules["is_blocked_domain"] = ~_to_bool(df["is_blocked_domain"])
+    if config.get("total_emails_sent", True):
+        rules["total_emails_sent"] = (
+            pd.to_numeric(df["total_emails_sent"], errors="coerce").fillna(0) == 0
+        )
+    return rules
+
+
 def filter_eligible_contacts(df: pd.DataFrame) -> pd.DataFrame:
     """
     Deterministic eligibility gate — only contacts that are safe to
@@ -36,40 +61,18 @@ def filter_eligible_contacts(df: pd.DataFrame) -> pd.DataFrame:
     who has already been emailed are removed *before* any AI touches
     the data.
     """
-    config = _load_config()
     total = len(df)
     print(f"[FILTER] Applying eligibility rules on {total} contacts …")
+    rules = _eligibility_rules(df, _load_config())
 
     # Start with a mask that passes everyone; each enabled rule narrows it
     mask = pd.Series(True, index=df.index)
-
-    if config.get("type", True):
-        rule = df["type"].astype(str).str.strip().str.lower() == "prospect"
-        print(f"[FILTER]   ├─ type == 'prospect'        : {rule.sum()} pass")
-        mask &= rule
-    else:
-        print(f"[FILTER]   ├─ type == 'prospect'        : SKIPPED (disabled in config)")
-
-    if config.get("Unsubscribed", True):
-        rule = ~_to_bool(df["Unsubscribed"])
-        print(f"[FILTER]   ├─ Unsubscribed == FALSE      : {rule.sum()} pass")
-        mask &= rule
-    else:
-        print(f"[FILTER]   ├─ Unsubscribed == FALSE      : SKIPPED (disabled in config)")
-
-    if config.get("is_blocked_domain", True):
-        rule = ~_to_bool(df["is_blocked_domain"])
-        print(f"[FILTER]   ├─ is_blocked_domain == FALSE  : {rule.sum()} pass")
-        mask &= rule
-    else:
-        print(f"[FILTER]   ├─ is_blocked_domain == FALSE  : SKIPPED (disabled in config)")
-
-    if config.get("total_emails_sent", True):
-        rule = pd.to_numeric(df["total_emails_sent"], errors="coerce").fillna(0) == 0
-        print(f"[FILTER]   ├─ total_emails_sent == 0      : {rule.sum()} pass")
-        mask &= rule
-    else:
-        print(f"[FILTER]   ├─ total_emails_sent == 0      : SKIPPED (disabled in config)")
+    for name, label in _RULE_LABELS.items():
+        if name in rules:
+            print(f"[FILTER]   ├─ {label}: {rules[name].sum()} pass")
+            mask &= rules[name]
+        else:
+            print(f"[FILTER]   ├─ {label}: SKIPPED (disabled in config)")
 
     filtered = df.loc[mask].reset_index(drop=True)
     dropped = total - len(filtered)
@@ -79,6 +82,15 @@ def filter_eligible_contacts(df: pd.DataFrame) -> pd.DataFrame:
     return filtered
 
 
+def ineligibility_reasons(df: pd.DataFrame) -> pd.Series:
+    """Comma-joined names of the enabled rules each row fails ("" if eligible)."""
+    rules = _eligibility_rules(df, _load_config())
+    reasons = pd.Series("", index=df.index)
+    for name, passed in rules.items():
+        reasons = reasons.mask(~passed, reasons + "," + name)
+    return reasons.str.lstrip(",")
+
+
 # ── Firmographic segment assignment ────────────────────────────────────
 
 def _assign_segment(row: pd.Series) -> str:
@@ -132,8 +144,8 @@ def assign_firmographic_segments(df: pd.DataFrame) -> pd.DataFrame:
 
 # ── Public entry point ─────────────────────────────────────────────────
 
-def load_cold_outreach_contacts(csv_path: Path | str) -> pd.DataFrame:
-    """Load → filter → segment.  Returns only outreach-ready contacts."""
+def load_contacts(csv_path: Path | str) -> pd.DataFrame:
+    """Stage 1 only: read the raw contact CSV."""
     csv_path = Path(csv_path)
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found: {csv_path}")
@@ -145,7 +157,11 @@ def load_cold_outreach_contacts(csv_path: Path | str) -> pd.DataFrame:
     df = pd.read_csv(csv_path)
     print(f"[LOAD] Loaded {len(df)} rows from {csv_path.name}")
     print(f"[LOAD] Columns: {list(df.columns)}")
+    return df
+
 
+def select_cold_outreach_contacts(df: pd.DataFrame) -> pd.DataFrame:
+    """Stages 2-3: filter → segment an already-loaded contact frame."""
     print()
     print("=" * 64)
     print("  STAGE 2 · ELIGIBILITY FILTER  (deterministic, no AI)")
@@ -160,3 +176,8 @@ def load_cold_outreach_contacts(csv_path: Path | str) -> pd.DataFrame:
 
     print()
     return df
+
+
+def load_cold_outreach_contacts(csv_path: Path | str) -> pd.DataFrame:
+    """Load → filter → segment.  Returns only outreach-ready contacts."""
+    return select_cold_outreach_contacts(load_contacts(csv_path))
@@ -1,4 +1,4 @@
-import pandas as pd
+from utils.contact import Contact
 
 # ── Firmographic segment angles (primary messaging driver) ──────────────
 _FIRMOGRAPHIC_ANGLES = {
@@ -58,20 +58,18 @@ _PROPERTY_TYPE_CONTEXT = {
 }
 
 
-def _safe(value, fallback="Not specified"):
-    if value is None or pd.isna(value) or not str(value).strip():
-        return fallback
-    return str(value).strip()
+def _safe(value: str, fallback: str = "Not specified") -> str:
+    return value or fallback
 
 
-def build_prompt(row, segment, company_size="unknown"):
-    email = row.get("email", "?")
-    first_name = _safe(row.get("first_name"), "there")
-    company = _safe(row.get("company_name"))
-    job_title = _safe(row.get("job_title"))
-    pms = _safe(row.get("PMS"))
-    property_type = _safe(row.get("type_of_properties_managed"))
-    region = _safe(row.get("region"))
+def build_prompt(contact: Contact, segment: str, company_size: str = "unknown") -> str:
+    email = contact.email or "?"
+    first_name = _safe(contact.first_name, "there")
+    company = _safe(contact.company_name)
+    job_title = _safe(contact.job_title)
+    pms = _safe(contact.pms)
+    property_type = _safe(contact.type_of_properties_managed)
+    region = _safe(contact.region)
 
     # Primary angle — firmographic segment
     firmo_angle = _FIRMOGRAPHIC_ANGLES.get(segment, _FIRMOGRAPHIC_ANGLES["general"])
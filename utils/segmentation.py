@@ -1,4 +1,4 @@
-import pandas as pd
+from utils.contact import Contact
 
 # ── Property-type mapping (secondary personalisation dimension) ─────────
 _PROPERTY_TYPE_SEGMENTS = {
@@ -13,53 +13,38 @@ _PROPERTY_TYPE_SEGMENTS = {
 
 # ── Company-size band (aligned with firmographic thresholds) ────────────
 
-def _company_size_band(mu_count):
-    try:
-        n = int(mu_count or 0)
-    except (TypeError, ValueError):
-        return "unknown"
-    if n >= 50:
+def _company_size_band(mu_count: int) -> str:
+    if mu_count >= 50:
         return "enterprise"
-    if 10 <= n <= 49:
+    if 10 <= mu_count <= 49:
         return "growth"
-    if 1 <= n <= 9:
+    if 1 <= mu_count <= 9:
         return "small"
     return "unknown"
 
 
 # ── Segment accessors ──────────────────────────────────────────────────
 
-def segment_contact(row):
+def segment_contact(contact: Contact) -> str:
     """Return the firmographic segment pre-assigned by filter_cold_outreach.
 
-    Falls back to property-type segmentation when the column is absent
+    Falls back to property-type segmentation when the segment is empty
     (e.g. in unit tests or ad-hoc usage).
     """
-    seg = row.get("firmographic_segment")
-    if seg and not pd.isna(seg) and str(seg).strip():
-        segment = str(seg).strip()
-    else:
-        # Fallback: property-type segmentation
-        raw = row.get("type_of_properties_managed")
-        if pd.isna(raw) or not str(raw).strip():
-            segment = "general"
-        else:
-            segment = _PROPERTY_TYPE_SEGMENTS.get(str(raw).strip().lower(), "general")
-
-    print(f"[SEGMENT-LOOKUP] {row.get('email', '?'):40s} → {segment}")
+    segment = contact.firmographic_segment or get_property_type_segment(contact)
+    print(f"[SEGMENT-LOOKUP] {contact.email or '?':40s} → {segment}")
     return segment
 
 
-def get_property_type_segment(row):
+def get_property_type_segment(contact: Contact) -> str:
     """Secondary dimension: what kind of properties they manage."""
-    raw = row.get("type_of_properties_managed")
-    if pd.isna(raw) or not str(raw).strip():
-        return "general"
-    return _PROPERTY_TYPE_SEGMENTS.get(str(raw).strip().lower(), "general")
+    return _PROPERTY_TYPE_SEGMENTS.get(
+        contact.type_of_properties_managed.lower(), "general"
+    )
 
 
-def get_company_size(row):
-    size = _company_size_band(row.get("MU_count"))
-    print(f"[SIZE-LOOKUP]    {row.get('email', '?'):40s} → {size} "
-          f"(MU_count={row.get('MU_count', '?')})")
+def get_company_size(contact: Contact) -> str:
+    size = _company_size_band(contact.mu_count)
+    print(f"[SIZE-LOOKUP]    {contact.email or '?':40s} → {size} "
+          f"(MU_count={contact.mu_count})")
     return size